@@ -18,6 +18,13 @@ admin.initializeApp({
 
 const db = admin.firestore();
 
+// Collection references, reused across requests
+const linksCollection = db.collection('links');
+const activitiesCollection = db.collection('activities');
+
+// Firestore rejects batched writes with more than 500 operations
+const MAX_BATCH_SIZE = 500;
+
 // Add error handlers
 process.on('uncaughtException', (err) => {
   console.error('Uncaught Exception:', err);
@@ -29,6 +36,9 @@ process.on('unhandledRejection', (err) => {
 
 // Middleware
 app.use(cors());
+// Backups easily exceed the default 100kb body limit; mounted first so the
+// global parser below skips the already-parsed body
+app.use('/api/import', express.json({ limit: '10mb' }));
 app.use(express.json());
 
 // Check multiple possible locations for static files
@@ -44,12 +54,23 @@ if (fs.existsSync(publicPath)) {
   app.use(express.static(rootPath));
 }
 
+// Resolve index.html once at startup, checking multiple possible locations
+const possibleIndexPaths = [
+  path.join(publicPath, 'index.html'),
+  path.join(rootPath, 'index.html')
+];
+const indexPath = possibleIndexPaths.find(possiblePath => fs.existsSync(possiblePath)) || null;
+
+if (indexPath) {
+  console.log(`Found index.html at: ${indexPath}`);
+}
+
 // API Routes
 
 // Get all links
 app.get('/api/links', async (req, res) => {
   try {
-    const linksSnapshot = await db.collection('links').orderBy('createdAt', 'desc').get();
+    const linksSnapshot = await linksCollection.orderBy('createdAt', 'desc').get();
     const links = [];
     
     linksSnapshot.forEach(doc => {
@@ -80,15 +101,18 @@ app.post('/api/links', async (req, res) => {
       updatedAt: admin.firestore.FieldValue.serverTimestamp()
     };
     
-    const docRef = await db.collection('links').add(newLink);
+    const docRef = linksCollection.doc();
     
-    // Add activity
-    await db.collection('activities').add({
+    // Write link and activity in a single batch
+    const batch = db.batch();
+    batch.set(docRef, newLink);
+    batch.set(activitiesCollection.doc(), {
       type: 'added',
       linkName: name,
       linkId: docRef.id,
       timestamp: admin.firestore.FieldValue.serverTimestamp()
     });
+    await batch.commit();
     
     const savedLink = { id: docRef.id, ...newLink };
     console.log('Link added successfully:', docRef.id);
@@ -113,17 +137,18 @@ app.put('/api/links/:id', async (req, res) => {
       updatedAt: admin.firestore.FieldValue.serverTimestamp()
     };
     
-    await db.collection('links').doc(id).update(updatedLink);
-    
-    // Add activity
-    await db.collection('activities').add({
+    // Write link and activity in a single batch
+    const batch = db.batch();
+    batch.update(linksCollection.doc(id), updatedLink);
+    batch.set(activitiesCollection.doc(), {
       type: 'edited',
       linkName: name,
       linkId: id,
       timestamp: admin.firestore.FieldValue.serverTimestamp()
     });
+    await batch.commit();
     
-    const linkDoc = await db.collection('links').doc(id).get();
+    const linkDoc = await linksCollection.doc(id).get();
     const savedLink = { id: linkDoc.id, ...linkDoc.data() };
     
     console.log('Link updated successfully:', id);
@@ -140,18 +165,19 @@ app.delete('/api/links/:id', async (req, res) => {
     const { id } = req.params;
     
     // Get link name before deletion for activity log
-    const linkDoc = await db.collection('links').doc(id).get();
+    const linkDoc = await linksCollection.doc(id).get();
     const linkName = linkDoc.data().name;
     
-    await db.collection('links').doc(id).delete();
-    
-    // Add activity
-    await db.collection('activities').add({
+    // Delete link and add activity in a single batch
+    const batch = db.batch();
+    batch.delete(linksCollection.doc(id));
+    batch.set(activitiesCollection.doc(), {
       type: 'deleted',
       linkName: linkName,
       linkId: id,
       timestamp: admin.firestore.FieldValue.serverTimestamp()
     });
+    await batch.commit();
     
     console.log('Link deleted successfully:', id);
     res.json({ success: true });
@@ -166,7 +192,7 @@ app.post('/api/links/:id/click', async (req, res) => {
   try {
     const { id } = req.params;
     
-    const linkRef = db.collection('links').doc(id);
+    const linkRef = linksCollection.doc(id);
     await linkRef.update({
       clicks: admin.firestore.FieldValue.increment(1)
     });
@@ -175,7 +201,7 @@ app.post('/api/links/:id/click', async (req, res) => {
     const linkData = updatedDoc.data();
     
     // Add activity
-    await db.collection('activities').add({
+    await activitiesCollection.add({
       type: 'clicked',
       linkName: linkData.name,
       linkId: id,
@@ -193,7 +219,7 @@ app.post('/api/links/:id/click', async (req, res) => {
 // Get activities
 app.get('/api/activities', async (req, res) => {
   try {
-    const activitiesSnapshot = await db.collection('activities')
+    const activitiesSnapshot = await activitiesCollection
       .orderBy('timestamp', 'desc')
       .limit(50)
       .get();
@@ -220,7 +246,7 @@ app.get('/api/activities', async (req, res) => {
 // Export all data for backup
 app.get('/api/export', async (req, res) => {
   try {
-    const linksSnapshot = await db.collection('links').get();
+    const linksSnapshot = await linksCollection.get();
     const links = [];
     
     linksSnapshot.forEach(doc => {
@@ -228,8 +254,9 @@ app.get('/api/export', async (req, res) => {
       links.push({
         id: doc.id,
         ...link,
-        createdAt: link.createdAt.toDate().toISOString(),
-        updatedAt: link.updatedAt.toDate().toISOString()
+        createdAt: link.createdAt ? link.createdAt.toDate().toISOString() : null,
+        // Links added from the browser client have no updatedAt until first edit
+        updatedAt: link.updatedAt ? link.updatedAt.toDate().toISOString() : null
       });
     });
     
@@ -249,11 +276,19 @@ app.post('/api/import', async (req, res) => {
       return res.status(400).json({ error: 'Invalid data format' });
     }
     
-    const batch = db.batch();
+    // Build and validate every link before writing anything, so a bad entry
+    // rejects the whole import instead of failing after earlier chunks landed
+    const linkDocs = [];
     
-    links.forEach(link => {
-      const linkRef = db.collection('links').doc();
-      const linkData = {
+    for (let i = 0; i < links.length; i++) {
+      const link = links[i];
+      
+      if (!link || typeof link !== 'object' ||
+          ['name', 'url', 'description', 'category'].some(field => link[field] === undefined)) {
+        return res.status(400).json({ error: `Invalid link at index ${i}` });
+      }
+      
+      linkDocs.push({
         name: link.name,
         url: link.url,
         description: link.description,
@@ -261,14 +296,29 @@ app.post('/api/import', async (req, res) => {
         clicks: link.clicks || 0,
         createdAt: admin.firestore.FieldValue.serverTimestamp(),
         updatedAt: admin.firestore.FieldValue.serverTimestamp()
-      };
-      batch.set(linkRef, linkData);
-    });
+      });
+    }
     
-    await batch.commit();
+    // Split large backups into chunks that fit in a single batch, committed
+    // one after another so a failure reports exactly how many links were written
+    let imported = 0;
     
-    console.log(`Imported ${links.length} links`);
-    res.json({ success: true, imported: links.length });
+    for (let i = 0; i < linkDocs.length; i += MAX_BATCH_SIZE) {
+      const chunk = linkDocs.slice(i, i + MAX_BATCH_SIZE);
+      
+      try {
+        const batch = db.batch();
+        chunk.forEach(linkData => batch.set(linksCollection.doc(), linkData));
+        await batch.commit();
+      } catch (error) {
+        console.error(`Error importing data after ${imported} of ${links.length} links:`, error);
+        return res.status(500).json({ error: 'Failed to import data', imported });
+      }
+      imported += chunk.length;
+    }
+    
+    console.log(`Imported ${imported} links`);
+    res.json({ success: true, imported });
   } catch (error) {
     console.error('Error importing data:', error);
     res.status(500).json({ error: 'Failed to import data' });
@@ -292,29 +342,12 @@ app.get('/debug', (req, res) => {
 // Serve the main page
 app.get('/', (req, res) => {
   try {
-    // Check multiple possible locations for index.html
-    const possiblePaths = [
-      path.join(publicPath, 'index.html'),
-      path.join(rootPath, 'index.html'),
-      path.join(__dirname, 'public', 'index.html'),
-      path.join(__dirname, 'index.html')
-    ];
-    
-    let indexPath = null;
-    for (const possiblePath of possiblePaths) {
-      if (fs.existsSync(possiblePath)) {
-        indexPath = possiblePath;
-        console.log(`Found index.html at: ${indexPath}`);
-        break;
-      }
-    }
-    
     if (indexPath) {
       res.sendFile(indexPath);
     } else {
       res.status(404).send(`
         <h1>Droneplus - index.html not found</h1>
-        <p>Checked paths: ${JSON.stringify(possiblePaths)}</p>
+        <p>Checked paths: ${JSON.stringify(possibleIndexPaths)}</p>
         <p><a href="/debug">Debug Info</a></p>
       `);
     }